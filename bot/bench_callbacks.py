@@ -0,0 +1,67 @@
+"""
+Сравнение стоимости маршрутизации колбэков: цепочка фильтров `call.data.startswith(...)`
+против CallbackTable. Запуск из папки bot: `python bench_callbacks.py`.
+"""
+
+from datetime import datetime, timezone
+import asyncio
+import time
+
+from aiogram import Bot, Dispatcher, types
+from callbacks import CallbackTable, TicketCallback
+
+ACTION_COUNTS = (4, 16, 64, 256)
+ROUNDS = 2000
+
+
+async def _noop(*_) -> None:
+    return
+
+
+def _update(data: str) -> types.Update:
+    user = types.User(id=1, is_bot=False, first_name="Bench")
+    message = types.Message(
+        message_id=1, date=datetime.now(tz=timezone.utc), chat=types.Chat(id=1, type="private"), text="bench"
+    )
+    callback = types.CallbackQuery(id="1", from_user=user, chat_instance="1", message=message, data=data)
+    return types.Update(update_id=1, callback_query=callback)
+
+
+def linear_dispatcher(actions: int) -> Dispatcher:
+    dispatcher = Dispatcher()
+    for number in range(actions):
+        dispatcher.callback_query(lambda call, prefix=f"action{number}_": call.data.startswith(prefix))(_noop)
+    return dispatcher
+
+
+def table_dispatcher(actions: int) -> Dispatcher:
+    dispatcher = Dispatcher()
+    table = CallbackTable()
+    for number in range(actions):
+        table.action(TicketCallback, f"action{number}")(_noop)
+    dispatcher.callback_query()(table.dispatch)
+    return dispatcher
+
+
+async def measure(dispatcher: Dispatcher, bot: Bot, data: str) -> float:
+    update = _update(data)
+    started = time.perf_counter()
+    for _ in range(ROUNDS):
+        await dispatcher.feed_update(bot, update)
+    return (time.perf_counter() - started) / ROUNDS * 1_000_000
+
+
+async def main() -> None:
+    bot = Bot(token="42:bench")  # noqa: S106
+    print(f"{'действий':>9} | {'фильтры, мкс':>13} | {'таблица, мкс':>13}")
+    for actions in ACTION_COUNTS:
+        # Худший случай для цепочки фильтров - последнее зарегистрированное действие.
+        last = actions - 1
+        linear = await measure(linear_dispatcher(actions), bot, f"action{last}_12")
+        table = await measure(table_dispatcher(actions), bot, TicketCallback(action=f"action{last}", id=12).pack())
+        print(f"{actions:>9} | {linear:>13.1f} | {table:>13.1f}")
+    await bot.session.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
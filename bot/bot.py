@@ -1,171 +1,293 @@
 import logging
-from typing import Literal
+from typing import Any
+from collections.abc import Sequence
 import asyncio
 import os
 import sys
 
-from aiogram import Bot, Dispatcher, filters, types
+from aiogram import Bot, Dispatcher, F, filters, types
 from aiogram.enums import ParseMode
+from aiogram.exceptions import TelegramAPIError
 from aiogram.filters.command import Command, CommandObject
 from aiogram.fsm.context import FSMContext
 from aiogram.types import BotCommand, BotCommandScopeChat, BotCommandScopeDefault
 from aiogram.utils.deep_linking import create_start_link
 from aiogram.utils.formatting import Text
-from custom_types import RegisterStates, TicketStates
+from broadcast import start_broadcast
+from callbacks import (
+    CallbackTable,
+    CommentsCallback,
+    DuplicateCallback,
+    QueueCallback,
+    TicketCallback,
+    UserCallback,
+    buttons_keyboard,
+)
+from custom_types import RegisterStates, TicketStateDTO, TicketStates
 from db import (
+    Ticket,
     add_blocked_user,
+    add_comment,
     add_ticket,
     all_blocked_users,
     check_blocked,
+    create_broadcast,
     edit_ticket_status,
     get_ticket_by_id,
+    link_duplicates,
+    list_comments,
     list_tickets,
     unblock_user,
 )
+from dedup import duplicate_index
 from dotenv import load_dotenv
-from utils import active_tickets, answer_register, check_user_registration, new_ticket, raw_reply, reply_list
-
-load_dotenv()
-API_TOKEN = os.getenv("API_TOKEN")
-_ADMIN_ID = os.getenv("ADMIN_ID")
-ACCESS_KEY = os.getenv("ACCESS_KEY")
-if not API_TOKEN or not _ADMIN_ID or not ACCESS_KEY:
-    logging.error("Отстутствуют переменные ENV.")
-    sys.exit(1)
-
-bot = Bot(token=API_TOKEN)
-ADMIN_ID = int(_ADMIN_ID)
+from relay import message_index
+from sla import sla_scheduler
+from startup import StartupTimer, warm_up
+from ticket_queue import ticket_queue
+from utils import (
+    active_tickets,
+    answer_register,
+    check_user_registration,
+    duplicate_cluster,
+    new_ticket,
+    raw_reply,
+    reply_list,
+)
+
+logger = logging.getLogger(__name__)
+
+# Заполняются в create_app(), импорт модуля не читает окружение и не создаёт Bot.
+bot: Bot
+ADMIN_ID: int = 0
+ACCESS_KEY: str = ""
 dispatcher = Dispatcher()
 
 
-def buttons_keyboard(
-    unique_id: int, keyboard_type: Literal["accept", "complete", "reject", "unlock"] = "accept"
-) -> types.InlineKeyboardMarkup:
-    """
-    Формирует клавиатуру в зависимости от нужного варианта.
-    'accept' - по умолчанию, кнопки Принять / Отменить.
-    'complete' - кнопки Отменить / Закрыть.
-    """
-
-    if keyboard_type == "accept":
-        buttons = [
-            [
-                types.InlineKeyboardButton(
-                    text="Принять заявку",
-                    callback_data=f"ticket_accept_{unique_id}",
-                ),
-                types.InlineKeyboardButton(
-                    text="Отменить заявку",
-                    callback_data=f"ticket_canceled_{unique_id}",
-                ),
-            ],
-        ]
-    elif keyboard_type == "complete":
-        buttons = [
-            [
-                types.InlineKeyboardButton(
-                    text="Отменить заявку",
-                    callback_data=f"ticket_canceled_{unique_id}",
-                ),
-                types.InlineKeyboardButton(
-                    text="Закрыть заявку",
-                    callback_data=f"ticket_completed_{unique_id}",
-                ),
-            ],
-        ]
+def create_app() -> tuple[Bot, Dispatcher]:
+    """Читает ENV и создаёт Bot. Обработчики уже зарегистрированы в dispatcher при импорте модуля."""
+    global bot, ADMIN_ID, ACCESS_KEY
+    load_dotenv()
+    api_token = os.getenv("API_TOKEN")
+    admin_id = os.getenv("ADMIN_ID")
+    access_key = os.getenv("ACCESS_KEY")
+    if not api_token or not admin_id or not access_key:
+        msg = "Отстутствуют переменные ENV."
+        raise RuntimeError(msg)
 
-    elif keyboard_type == "reject":
-        buttons = [
-            [
-                types.InlineKeyboardButton(
-                    text="Отменить заявку",
-                    callback_data=f"ticket_usercancel_{unique_id}",
-                ),
-            ],
-        ]
-    else:
-        buttons = [
-            [
-                types.InlineKeyboardButton(
-                    text="Разблокировать пользователя.",
-                    callback_data=f"user_unlock_{unique_id}",
-                )
-            ]
-        ]
-    return types.InlineKeyboardMarkup(inline_keyboard=buttons)
+    bot = Bot(token=api_token)
+    ADMIN_ID = int(admin_id)
+    ACCESS_KEY = access_key
+    return bot, dispatcher
 
 
 async def generate_start_link(our_bot: Bot):
     return await create_start_link(our_bot, ACCESS_KEY)
 
 
-@dispatcher.callback_query(lambda call: call.data.startswith("user_"))
-async def manage_users(callback: types.CallbackQuery):
-    if not callback.data:
-        return
-    _, action, uid = callback.data.split("_")
-    if action == "unlock":
-        unblock_user(uid)
-        till_block_counter.pop(int(uid))
-        await callback.message.edit_text(f"Пользователь {uid} разблокирован.")
-        await bot.send_message(chat_id=uid, text="Вы были разблокированы администратором бота.")
+callback_table = CallbackTable()
+
+
+@dispatcher.callback_query()
+async def route_callback(callback: types.CallbackQuery):
+    if not await callback_table.dispatch(callback):
+        await callback.answer()
+
+
+@callback_table.action(UserCallback, "unlock")
+async def unlock_user_button(callback: types.CallbackQuery, callback_data: UserCallback):
+    uid = callback_data.id
+    unblock_user(uid)
+    till_block_counter.pop(uid, None)
+    await callback.message.edit_text(f"Пользователь {uid} разблокирован.")
+    await bot.send_message(chat_id=uid, text="Вы были разблокированы администратором бота.")
     await callback.answer()
 
 
-@dispatcher.callback_query(lambda call: call.data.startswith("ticket_"))
-async def send_message_users(callback: types.CallbackQuery):
-    if not callback.data:
-        return
-    _, status, ticket_id = callback.data.split("_")
-    if not (ticket := get_ticket_by_id(int(ticket_id))):
-        return
+async def send_ticket_message(chat_id: int, ticket_id: int, ticket_user_uid: int, **kwargs: Any) -> types.Message:
+    """Отправляет сообщение по тикету и запоминает его, чтобы ответ на него переслать второй стороне."""
+    sent = await bot.send_message(chat_id=chat_id, **kwargs)
+    message_index.remember(chat_id, sent.message_id, ticket_id, ticket_user_uid)
+    return sent
 
-    if status == "accept":
-        edit_ticket_status(ticket.id, "in_work")
-        await bot.send_message(
-            chat_id=ticket.user_uid,
-            text=f"Ваша заявка: {ticket.id} \nОписание: {ticket.description}\nпринята в работу!",
-        )
+
+async def reply_ticket_message(
+    message: types.Message, ticket_id: int, ticket_user_uid: int, *args: Any, **kwargs: Any
+) -> types.Message:
+    """То же, что send_ticket_message, но ответом на сообщение пользователя."""
+    sent = await message.reply(*args, **kwargs)
+    message_index.remember(sent.chat.id, sent.message_id, ticket_id, ticket_user_uid)
+    return sent
+
+
+async def accept_ticket(ticket: Ticket):
+    edit_ticket_status(ticket.id, "in_work")
+    await send_ticket_message(
+        ticket.user_uid,
+        ticket.id,
+        ticket.user_uid,
+        text=f"Ваша заявка: {ticket.id} \nОписание: {ticket.description}\nпринята в работу!",
+    )
+
+
+@callback_table.action(TicketCallback, "accept")
+async def accept_ticket_button(callback: types.CallbackQuery, callback_data: TicketCallback):
+    if ticket := get_ticket_by_id(callback_data.id):
+        await accept_ticket(ticket)
         await callback.message.edit_text(
-            f"Заявка {ticket_id} принята в работу. \nОписание заявки: {ticket.description}",
-            reply_markup=buttons_keyboard(ticket_id, "complete"),
+            f"Заявка {ticket.id} принята в работу. \nОписание заявки: {ticket.description}",
+            reply_markup=buttons_keyboard(ticket.id, "complete"),
         )
-    elif status == "canceled":
+    await callback.answer()
+
+
+@callback_table.action(TicketCallback, "canceled")
+async def cancel_ticket_button(callback: types.CallbackQuery, callback_data: TicketCallback):
+    if ticket := get_ticket_by_id(callback_data.id):
         edit_ticket_status(
             ticket.id,
             "rejected",
             "Заявка отменена администратором.",
         )
-        await bot.send_message(
-            chat_id=ticket.user_uid,
+        await send_ticket_message(
+            ticket.user_uid,
+            ticket.id,
+            ticket.user_uid,
             text=f"Ваша заявка {ticket.id} отменена.",
         )
-        await callback.message.edit_text(f"Заявка {ticket_id} отменена.")
-    elif status == "usercancel":
+        await callback.message.edit_text(f"Заявка {ticket.id} отменена.")
+    await callback.answer()
+
+
+@callback_table.action(TicketCallback, "usercancel")
+async def user_cancel_ticket_button(callback: types.CallbackQuery, callback_data: TicketCallback):
+    if ticket := get_ticket_by_id(callback_data.id):
         edit_ticket_status(
             ticket.id,
             "rejected",
             "Заявка отменена пользователем.",
         )
         await callback.message.edit_text(f"Вы отменили заявку {ticket.id}.")
-        await bot.send_message(chat_id=ADMIN_ID, text=f"Заявка {ticket_id} отменена пользователем.")
+        await send_ticket_message(
+            ADMIN_ID, ticket.id, ticket.user_uid, text=f"Заявка {ticket.id} отменена пользователем."
+        )
+    await callback.answer()
+
 
-    elif status == "completed":
+@callback_table.action(TicketCallback, "completed")
+async def complete_ticket_button(callback: types.CallbackQuery, callback_data: TicketCallback):
+    if ticket := get_ticket_by_id(callback_data.id):
         edit_ticket_status(ticket.id, "completed")
-        await bot.send_message(
-            chat_id=ticket.user_uid,
+        await send_ticket_message(
+            ticket.user_uid,
+            ticket.id,
+            ticket.user_uid,
             text=f"Ваша заявка: {ticket.id} \nОписание: {ticket.description}\nвыполнена!",
         )
-        await callback.message.edit_text(f"Заявка {ticket_id} завершена.")
+        await callback.message.edit_text(f"Заявка {ticket.id} завершена.")
+    await callback.answer()
+
+
+@callback_table.action(DuplicateCallback, "link")
+async def link_duplicates_button(callback: types.CallbackQuery, callback_data: DuplicateCallback):
+    cluster = duplicate_cluster(callback_data.id)
+    root_id = cluster[0]
+    link_duplicates(root_id, cluster)
+    await callback.message.edit_text(
+        f"Заявки {', '.join(map(str, cluster))} связаны с заявкой {root_id}.",
+        reply_markup=buttons_keyboard(callback_data.id),
+    )
+    await callback.answer()
+
+
+async def notify_ticket_completed(ticket: Ticket) -> bool:
+    """Сообщает автору о закрытии заявки. Возвращает False, если сообщение не доставлено."""
+    try:
+        await send_ticket_message(
+            ticket.user_uid,
+            ticket.id,
+            ticket.user_uid,
+            text=f"Ваша заявка: {ticket.id} \nОписание: {ticket.description}\nвыполнена!",
+        )
+    except TelegramAPIError as error:
+        logger.warning("Не удалось уведомить %s о закрытии заявки %s: %s", ticket.user_uid, ticket.id, error)
+        return False
+    return True
+
+
+@callback_table.action(DuplicateCallback, "close")
+async def close_duplicates_button(callback: types.CallbackQuery, callback_data: DuplicateCallback):
+    cluster = duplicate_cluster(callback_data.id)
+    root_id = cluster[0]
+    closed = []
+    for duplicate_id in cluster:
+        ticket = get_ticket_by_id(duplicate_id)
+        if not ticket or ticket.status in ("completed", "rejected"):
+            continue
+        edit_ticket_status(ticket.id, "completed", f"Заявка закрыта вместе с группой {root_id}.")
+        closed.append(ticket)
+
+    # Уведомления отправляются после закрытия: недоступный автор одной заявки не должен прерывать закрытие группы.
+    not_notified = [ticket.id for ticket in closed if not await notify_ticket_completed(ticket)]
+
+    if closed:
+        text = f"Группа заявок {root_id} закрыта: {', '.join(str(ticket.id) for ticket in closed)}."
+    else:
+        text = f"В группе заявок {root_id} не осталось открытых заявок."
+    if not_notified:
+        text += f"\nНе удалось уведомить авторов заявок: {', '.join(map(str, not_notified))}."
+    await callback.message.edit_text(text)
+    await callback.answer()
+
+
+@callback_table.action(QueueCallback, "take")
+async def take_next_ticket(callback: types.CallbackQuery, callback_data: QueueCallback):
+    if callback.message.chat.id != ADMIN_ID:
+        await callback.answer()
+        return
+    while (ticket_id := ticket_queue.pop()) is not None:
+        ticket = get_ticket_by_id(ticket_id)
+        if ticket and ticket.status == "new":
+            break
+    else:
+        await callback.answer("Очередь пуста.")
+        return
 
+    await accept_ticket(ticket)
+    await send_ticket_message(
+        ADMIN_ID,
+        ticket.id,
+        ticket.user_uid,
+        **Text(f"Заявка {ticket.id} принята в работу.\n", raw_reply(ticket.as_ticket_dict())).as_kwargs(),
+        reply_markup=buttons_keyboard(ticket.id, "complete"),
+    )
+    await callback.message.edit_text(**queue_reply(), reply_markup=buttons_keyboard(0, "queue"))
     await callback.answer()
 
 
-async def admin_to_accept_button(reply_text: Text, ticket_id: int):
-    await bot.send_message(
-        chat_id=ADMIN_ID,
-        text=f"Новая заявка: \n{reply_text.as_html()}\nПод номером {ticket_id} создана.",
-        reply_markup=buttons_keyboard(ticket_id),
+async def admin_to_accept_button(reply_text: Text, ticket_id: int, user_uid: int, duplicates: Sequence[int] = ()):
+    text = f"Новая заявка: \n{reply_text.as_html()}\nПод номером {ticket_id} создана."
+    if duplicates:
+        text += f"\nВозможные дубликаты открытых заявок: {', '.join(map(str, duplicates))}."
+    await send_ticket_message(
+        ADMIN_ID,
+        ticket_id,
+        user_uid,
+        text=text,
+        reply_markup=buttons_keyboard(ticket_id, "duplicate" if duplicates else "accept"),
+    )
+
+
+async def send_sla_reminder(state: TicketStateDTO, level: int):
+    if not (ticket := get_ticket_by_id(state.id)):
+        return
+    status_text = "не принята в работу" if state.status == "new" else "не закрыта"
+    await send_ticket_message(
+        ADMIN_ID,
+        ticket.id,
+        ticket.user_uid,
+        text=f"Просрочен SLA (напоминание {level}): заявка {ticket.id} {status_text}.\nОписание: {ticket.description}",
+        reply_markup=buttons_keyboard(ticket.id, "accept" if state.status == "new" else "complete"),
     )
 
 
@@ -181,7 +303,9 @@ async def cmd_help(message: types.Message):
         "/tickets - команда для проверки ваших заявок.\n"
         "/cancel - команда для отмены заявки <code>/cancel (номер тикета для отмены)</code>.\n"
         "/complete - команда для самостоятельного закрытия заявки "
-        "<code>/complete (номер тикета для завершения)</code>.",
+        "<code>/complete (номер тикета для завершения)</code>.\n"
+        "/comments - команда для просмотра переписки по заявке <code>/comments (номер тикета)</code>.\n"
+        "Чтобы дополнить заявку или ответить администратору, ответьте (reply) на сообщение бота по этой заявке.",
         parse_mode=ParseMode.HTML,
     )
 
@@ -316,7 +440,7 @@ async def cmd_tickets(message: types.Message, command: CommandObject) -> None:
             await message.answer("Вы ещё не создали ни одного тикета.")
             return
         for user_ticket in user_tickets:
-            await message.answer(**reply_list(user_ticket))
+            await send_ticket_message(message.chat.id, user_ticket.id, user_ticket.user_uid, **reply_list(user_ticket))
         return
 
     if command.args != "new":
@@ -324,14 +448,35 @@ async def cmd_tickets(message: types.Message, command: CommandObject) -> None:
             await message.reply("В базе данных нет тикетов.")
             return
         for user_ticket in user_tickets:
-            await message.answer(**reply_list(user_ticket))
+            await send_ticket_message(message.chat.id, user_ticket.id, user_ticket.user_uid, **reply_list(user_ticket))
         return
 
     if not (user_tickets := list_tickets(status="new")):
         await message.reply("В базе данных нет тикетов.")
         return
     for user_ticket in user_tickets:
-        await message.answer(**reply_list(user_ticket))
+        await send_ticket_message(message.chat.id, user_ticket.id, user_ticket.user_uid, **reply_list(user_ticket))
+
+
+QUEUE_PAGE_SIZE = 10
+
+
+def queue_reply() -> dict:
+    """Первые заявки очереди в порядке приоритета."""
+    lines = [f"Очередь новых заявок: {len(ticket_queue)}."]
+    lines.extend(
+        f"{ticket.id}: {ticket.title}"
+        for ticket_id in ticket_queue.peek(QUEUE_PAGE_SIZE)
+        if (ticket := get_ticket_by_id(ticket_id))
+    )
+    return Text("\n".join(lines)).as_kwargs()
+
+
+@dispatcher.message(Command("queue"))
+async def cmd_queue(message: types.Message) -> None:
+    if message.chat.id != ADMIN_ID:
+        return
+    await message.answer(**queue_reply(), reply_markup=buttons_keyboard(0, "queue"))
 
 
 @dispatcher.message(Command("new_ticket"))
@@ -367,9 +512,11 @@ async def process_description(message: types.Message, state: FSMContext) -> None
     reply_text = raw_reply(ticket_dict)
     ticket_id = add_ticket(ticket_dict)
 
-    await admin_to_accept_button(reply_text, ticket_id)
+    await admin_to_accept_button(reply_text, ticket_id, user_id, duplicate_index.similar(ticket_id))
     if user_id != ADMIN_ID:
-        await message.reply(reply_text.as_html(), reply_markup=buttons_keyboard(ticket_id, "reject"))
+        await reply_ticket_message(
+            message, ticket_id, user_id, reply_text.as_html(), reply_markup=buttons_keyboard(ticket_id, "reject")
+        )
 
     await state.set_state(None)
 
@@ -389,12 +536,16 @@ async def cmd_cancel_ticket(message: types.Message, command: CommandObject) -> N
         await message.answer(tickets)
         return
     ticket_id = int(command.args)
-    if not get_ticket_by_id(ticket_id):
+    if not (ticket := get_ticket_by_id(ticket_id)):
         await message.reply("Вы не создавали тикета с таким номером.")
         return
     edit_ticket_status(ticket_id, "rejected", "Заявка отменена пользователем.")
-    await message.reply(f"Ваш тикет под номером {ticket_id} успешно отменен.")
-    await bot.send_message(chat_id=ADMIN_ID, text=f"Заявка {ticket_id} отменена пользователем.")
+    text = f"Ваш тикет под номером {ticket_id} успешно отменен."
+    if message.chat.id == ticket.user_uid:
+        await reply_ticket_message(message, ticket_id, ticket.user_uid, text)
+    else:
+        await message.reply(text)
+    await send_ticket_message(ADMIN_ID, ticket_id, ticket.user_uid, text=f"Заявка {ticket_id} отменена пользователем.")
 
 
 @dispatcher.message(Command("complete"))
@@ -412,12 +563,16 @@ async def cmd_complete_ticket(message: types.Message, command: CommandObject) ->
         await message.answer(tickets)
         return
     ticket_id = int(command.args)
-    if not get_ticket_by_id(ticket_id):
+    if not (ticket := get_ticket_by_id(ticket_id)):
         await message.reply("Вы не создавали тикета с таким номером.")
         return
     edit_ticket_status(ticket_id, "completed", "Заявка завершена пользователем.")
-    await message.reply(f"Ваш тикет под номером {ticket_id} успешно завершен.")
-    await bot.send_message(chat_id=ADMIN_ID, text=f"Заявка {ticket_id} завершена пользователем.")
+    text = f"Ваш тикет под номером {ticket_id} успешно завершен."
+    if message.chat.id == ticket.user_uid:
+        await reply_ticket_message(message, ticket_id, ticket.user_uid, text)
+    else:
+        await message.reply(text)
+    await send_ticket_message(ADMIN_ID, ticket_id, ticket.user_uid, text=f"Заявка {ticket_id} завершена пользователем.")
 
 
 @dispatcher.message(Command("check_admin"))
@@ -466,6 +621,99 @@ async def cmd_unblock_user(message: types.Message, command: CommandObject) -> No
         await message.answer(f"Пользователь {int(command.args)} разблокирован.")
 
 
+@dispatcher.message(Command("broadcast"))
+async def cmd_broadcast(message: types.Message, command: CommandObject) -> None:
+    if message.chat.id != ADMIN_ID:
+        return
+    if command.args is None:
+        await message.reply("Укажите текст рассылки: <code>/broadcast (текст сообщения)</code>.", parse_mode=ParseMode.HTML)
+        return
+    progress = await message.answer("Рассылка запускается...")
+    broadcast_id = create_broadcast(command.args, progress.chat.id, progress.message_id)
+    start_broadcast(bot, broadcast_id)
+
+
+COMMENTS_PAGE_SIZE = 10
+COMMENT_PREVIEW_LENGTH = 300
+
+
+def comments_page(ticket_id: int, after_id: int = 0) -> dict:
+    """Страница переписки по тикету с кнопкой перехода к следующей странице."""
+    comments = list_comments(ticket_id, after_id, COMMENTS_PAGE_SIZE + 1)
+    has_more = len(comments) > COMMENTS_PAGE_SIZE
+    comments = comments[:COMMENTS_PAGE_SIZE]
+    if not comments:
+        return Text(f"По заявке {ticket_id} нет переписки.").as_kwargs()
+
+    lines = [f"Переписка по заявке {ticket_id}:"]
+    for comment in comments:
+        author = "Администратор" if comment.author_uid == ADMIN_ID else "Пользователь"
+        text = comment.text
+        if len(text) > COMMENT_PREVIEW_LENGTH:
+            text = text[:COMMENT_PREVIEW_LENGTH] + "..."
+        lines.append(f"[{comment.dates_created:%d.%m %H:%M}] {author}: {text}")
+    kwargs = Text("\n".join(lines)).as_kwargs()
+    if has_more:
+        next_page = CommentsCallback(action="next", id=ticket_id, after=comments[-1].id)
+        kwargs["reply_markup"] = types.InlineKeyboardMarkup(
+            inline_keyboard=[[types.InlineKeyboardButton(text="Далее", callback_data=next_page.pack())]]
+        )
+    return kwargs
+
+
+def can_view_ticket(chat_id: int, ticket: Ticket) -> bool:
+    return chat_id in (ADMIN_ID, ticket.user_uid)
+
+
+@dispatcher.message(Command("comments"))
+async def cmd_comments(message: types.Message, command: CommandObject) -> None:
+    if check_blocked(message.from_user.id) is True:
+        await message.answer("Вы заблокированы. Обратитесь к администратору.")
+        return
+    if command.args is None or not command.args.isdigit():
+        await message.reply(
+            "Правильный вызов данной команды: <code>/comments (номер тикета)</code>.", parse_mode=ParseMode.HTML
+        )
+        return
+    ticket = get_ticket_by_id(int(command.args))
+    if not ticket or not can_view_ticket(message.chat.id, ticket):
+        await message.reply("Вы не создавали тикета с таким номером.")
+        return
+    await message.answer(**comments_page(ticket.id))
+
+
+@callback_table.action(CommentsCallback, "next")
+async def comments_next_page(callback: types.CallbackQuery, callback_data: CommentsCallback):
+    ticket = get_ticket_by_id(callback_data.id)
+    if ticket and can_view_ticket(callback.message.chat.id, ticket):
+        await callback.message.edit_text(**comments_page(ticket.id, callback_data.after))
+    await callback.answer()
+
+
+@dispatcher.message(filters.StateFilter(None), F.reply_to_message, F.text)
+async def relay_reply(message: types.Message) -> None:
+    """Ответ на сообщение бота по тикету пересылается второй стороне и сохраняется как комментарий."""
+    if message.chat.id != ADMIN_ID and check_blocked(message.from_user.id) is True:
+        return
+    ticket_ref = message_index.get(message.chat.id, message.reply_to_message.message_id)
+    if ticket_ref is None or ticket_ref[1] == ADMIN_ID or message.chat.id not in (ADMIN_ID, ticket_ref[1]):
+        # Заявку не удалось определить, второй стороны переписки нет (заявку создал сам администратор),
+        # либо пишет не автор заявки.
+        await message.reply(
+            "Это сообщение не относится к заявке, ответ не передан.\n"
+            "Чтобы написать по заявке, ответьте (reply) на сообщение бота по этой заявке."
+        )
+        return
+    ticket_id, ticket_user_uid = ticket_ref
+    if message.chat.id == ADMIN_ID:
+        recipient, header = ticket_user_uid, f"Ответ администратора по заявке {ticket_id}:"
+    else:
+        recipient, header = ADMIN_ID, f"Сообщение пользователя по заявке {ticket_id}:"
+
+    add_comment(ticket_id, message.chat.id, message.text)
+    await send_ticket_message(recipient, ticket_id, ticket_user_uid, text=f"{header}\n{message.text}")
+
+
 async def set_commands(is_admin):
     if is_admin:
         commands = [
@@ -474,11 +722,14 @@ async def set_commands(is_admin):
             BotCommand(command="tickets", description="Команда для проверки ваших заявок"),
             BotCommand(command="cancel", description="Команда для отмены заявки"),
             BotCommand(command="complete", description="Команда для самостоятельного закрытия заявки"),
+            BotCommand(command="comments", description="Команда для просмотра переписки по заявке"),
             BotCommand(command="help", description="Справка по командам"),
             BotCommand(command="tickets", description="Команда для создания новой заявки"),
             BotCommand(command="check_admin", description="Команда для проверки статуса Admin"),
             BotCommand(command="block", description="Команда для блокировки пользователя"),
             BotCommand(command="unblock", description="Команда для разблокировки пользователя"),
+            BotCommand(command="queue", description="Очередь новых заявок по приоритету"),
+            BotCommand(command="broadcast", description="Команда для рассылки сообщения всем пользователям"),
         ]
         await bot.set_my_commands(commands, BotCommandScopeChat(chat_id=ADMIN_ID))
 
@@ -489,17 +740,40 @@ async def set_commands(is_admin):
             BotCommand(command="tickets", description="Команда для проверки ваших заявок"),
             BotCommand(command="cancel", description="Команда для отмены заявки"),
             BotCommand(command="complete", description="Команда для самостоятельного закрытия заявки"),
+            BotCommand(command="comments", description="Команда для просмотра переписки по заявке"),
             BotCommand(command="help", description="Справка по командам"),
         ]
         await bot.set_my_commands(commands, BotCommandScopeDefault())
 
 
+async def notify_admin_started(our_bot: Bot, report: str):
+    try:
+        await our_bot.send_message(
+            chat_id=ADMIN_ID,
+            text=f"Бот запущен, приглашение работает по ссылке {await generate_start_link(our_bot)}\n{report}",
+        )
+    except Exception:
+        logger.exception("Не удалось отправить администратору ссылку-приглашение.")
+
+
 async def main():
-    await bot.send_message(
-        chat_id=ADMIN_ID,
-        text=f"Бот запущен, приглашение работает по ссылке {await generate_start_link(bot)}",
-    )
-    await dispatcher.start_polling(bot, skip_updates=True)
+    timer = StartupTimer()
+    try:
+        with timer.phase("create_app"):
+            our_bot, our_dispatcher = create_app()
+    except RuntimeError as error:
+        logger.error(error)
+        sys.exit(1)
+    for broadcast_id in await warm_up(timer, our_bot):
+        start_broadcast(our_bot, broadcast_id)
+    sla_task = asyncio.create_task(sla_scheduler.run(send_sla_reminder))
+    # Уведомление не блокирует старт polling.
+    notify_task = asyncio.create_task(notify_admin_started(our_bot, timer.report()))
+    try:
+        await our_dispatcher.start_polling(our_bot, skip_updates=True)
+    finally:
+        sla_task.cancel()
+        notify_task.cancel()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,174 @@
+import logging
+from typing import TYPE_CHECKING
+import asyncio
+import contextlib
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramAPIError, TelegramBadRequest, TelegramForbiddenError, TelegramRetryAfter
+from db import (
+    advance_broadcast,
+    count_users,
+    delete_user,
+    delivered_uids,
+    get_broadcast,
+    next_recipients,
+    record_delivery,
+)
+
+if TYPE_CHECKING:
+    from custom_types import delivery_status_type
+
+logger = logging.getLogger(__name__)
+
+# Глобальный лимит Telegram на исходящие сообщения бота.
+BROADCAST_RATE = 30
+CHUNK_SIZE = 200
+PROGRESS_INTERVAL = 5.0
+
+_running: dict[int, asyncio.Task] = {}
+
+
+class RateLimiter:
+    """Раздаёт слоты отправки с равным шагом 1/rate; отправки идут параллельно, но не чаще лимита."""
+
+    def __init__(self, rate: float) -> None:
+        self._interval = 1 / rate
+        self._next_slot = 0.0
+        self._paused_until = 0.0
+
+    async def wait(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            now = loop.time()
+            slot = max(self._next_slot, self._paused_until, now)
+            self._next_slot = slot + self._interval
+            if slot > now:
+                await asyncio.sleep(slot - now)
+            # Пока ждали слот, Telegram мог потребовать паузу - тогда слот недействителен, берём новый.
+            if loop.time() >= self._paused_until:
+                return
+
+    def pause(self, seconds: float) -> None:
+        """Запрещает отправку на seconds после ответа Telegram 'retry after', в том числе уже выданные слоты."""
+        self._paused_until = max(self._paused_until, asyncio.get_running_loop().time() + seconds)
+
+
+# Один лимитер на все рассылки и отчёты про прогресс: лимит Telegram общий для бота.
+limiter = RateLimiter(BROADCAST_RATE)
+
+
+async def _deliver(bot: Bot, broadcast_id: int, text: str, user_uid: int) -> None:
+    status: delivery_status_type
+    while True:
+        await limiter.wait()
+        try:
+            await bot.send_message(chat_id=user_uid, text=text)
+        except TelegramRetryAfter as error:
+            limiter.pause(error.retry_after)
+            continue
+        except TelegramForbiddenError:
+            status = "blocked"
+            delete_user(user_uid)
+        except TelegramAPIError as error:
+            logger.warning("Рассылка %s: не удалось отправить %s: %s", broadcast_id, user_uid, error)
+            status = "failed"
+        else:
+            status = "sent"
+        break
+    record_delivery(broadcast_id, user_uid, status)
+
+
+async def _report_progress(bot: Bot, broadcast_id: int, total: int) -> None:
+    if not (broadcast := get_broadcast(broadcast_id)):
+        return
+    title = "Рассылка завершена" if broadcast.status == "done" else "Идёт рассылка"
+    await limiter.wait()
+    # Прогресс не критичен: ошибка обновления не должна останавливать рассылку.
+    try:
+        await bot.edit_message_text(
+            chat_id=broadcast.chat_id,
+            message_id=broadcast.progress_message_id,
+            text=(
+                f"{title} {broadcast.id}: обработано {broadcast.sent + broadcast.failed + broadcast.pruned} из {total}.\n"
+                f"Доставлено: {broadcast.sent}, ошибок: {broadcast.failed}, "
+                f"удалено заблокировавших бота: {broadcast.pruned}."
+            ),
+        )
+    except TelegramRetryAfter as error:
+        limiter.pause(error.retry_after)
+    except TelegramBadRequest:
+        # Текст не изменился или сообщение удалено.
+        pass
+    except TelegramAPIError as error:
+        logger.warning("Рассылка %s: не удалось обновить прогресс: %s", broadcast_id, error)
+
+
+async def run_broadcast(bot: Bot, broadcast_id: int) -> None:
+    """
+    Рассылает сообщение всем пользователям страницами по CHUNK_SIZE.
+    Пока отправляется текущая страница, предыдущая дожидается завершения и её курсор сохраняется,
+    поэтому темп отправки не проседает на границах страниц, а в памяти не больше двух страниц.
+    После перезапуска рассылка продолжается с сохранённого курсора, уже обработанные получатели пропускаются.
+    """
+    if not (broadcast := get_broadcast(broadcast_id)) or broadcast.status == "done":
+        return
+    loop = asyncio.get_running_loop()
+    total = count_users() + broadcast.pruned
+    cursor = broadcast.last_user_id
+    previous: tuple[asyncio.Future, int] | None = None
+    last_report = loop.time()
+
+    try:
+        while recipients := next_recipients(cursor, CHUNK_SIZE):
+            done = delivered_uids(broadcast_id, [user_uid for _, user_uid in recipients])
+            cursor = recipients[-1][0]
+            chunk = asyncio.gather(
+                *(
+                    _deliver(bot, broadcast_id, broadcast.text, user_uid)
+                    for _, user_uid in recipients
+                    if user_uid not in done
+                )
+            )
+            if previous:
+                pending, previous = previous, (chunk, cursor)
+                await pending[0]
+                advance_broadcast(broadcast_id, pending[1])
+            else:
+                previous = (chunk, cursor)
+            if loop.time() - last_report >= PROGRESS_INTERVAL:
+                await _report_progress(bot, broadcast_id, total)
+                last_report = loop.time()
+
+        if previous:
+            await previous[0]
+    finally:
+        # При остановке бота не оставляем висящих отправок, продолжим от курсора при следующем запуске.
+        if previous and not previous[0].done():
+            previous[0].cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await previous[0]
+    advance_broadcast(broadcast_id, cursor, done=True)
+    await _report_progress(bot, broadcast_id, total)
+
+
+async def _run_reporting_errors(bot: Bot, broadcast_id: int) -> None:
+    # Фоновая задача иначе завершилась бы молча: пишем ошибку в лог и сообщаем администратору.
+    try:
+        await run_broadcast(bot, broadcast_id)
+    except Exception:
+        logger.exception("Рассылка %s остановлена с ошибкой", broadcast_id)
+        if broadcast := get_broadcast(broadcast_id):
+            with contextlib.suppress(TelegramAPIError):
+                await bot.send_message(
+                    chat_id=broadcast.chat_id,
+                    text=f"Рассылка {broadcast_id} остановлена из-за ошибки, она продолжится после перезапуска бота.",
+                )
+
+
+def start_broadcast(bot: Bot, broadcast_id: int) -> None:
+    """Запускает рассылку фоновой задачей, если она ещё не выполняется."""
+    if broadcast_id in _running:
+        return
+    task = asyncio.create_task(_run_reporting_errors(bot, broadcast_id))
+    _running[broadcast_id] = task
+    task.add_done_callback(lambda _: _running.pop(broadcast_id, None))
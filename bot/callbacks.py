@@ -0,0 +1,137 @@
+from collections.abc import Awaitable, Callable
+from typing import Literal, TypeVar
+
+from aiogram import types
+from aiogram.filters.callback_data import CallbackData
+
+
+class TicketCallback(CallbackData, prefix="ticket"):
+    action: str
+    id: int
+
+
+class UserCallback(CallbackData, prefix="user"):
+    action: str
+    id: int
+
+
+class DuplicateCallback(CallbackData, prefix="dup"):
+    action: str
+    id: int
+
+
+class QueueCallback(CallbackData, prefix="queue"):
+    action: str
+    id: int
+
+
+class CommentsCallback(CallbackData, prefix="comments"):
+    action: str
+    id: int
+    after: int = 0
+
+
+CallbackT = TypeVar("CallbackT", bound=CallbackData)
+CallbackHandler = Callable[[types.CallbackQuery, CallbackT], Awaitable[None]]
+
+
+def _from_legacy(data: str) -> str:
+    # Кнопки в старых сообщениях имеют вид 'ticket_usercancel_12', id всегда последний.
+    prefix, _, rest = data.partition("_")
+    action, _, unique_id = rest.rpartition("_")
+    return f"{prefix}:{action}:{unique_id}"
+
+
+class CallbackTable:
+    """
+    Таблица обработчиков колбэков: prefix -> (фабрика CallbackData, action -> обработчик).
+    Поиск обработчика - два обращения к dict вместо последовательной проверки фильтров.
+    """
+
+    def __init__(self) -> None:
+        self._routes: dict[str, tuple[type[CallbackData], dict[str, CallbackHandler]]] = {}
+
+    def __len__(self) -> int:
+        return sum(len(handlers) for _, handlers in self._routes.values())
+
+    def action(
+        self, factory: type[CallbackT], *actions: str
+    ) -> Callable[[CallbackHandler[CallbackT]], CallbackHandler[CallbackT]]:
+        """Регистрирует обработчик для одного или нескольких действий фабрики."""
+
+        def decorator(handler: CallbackHandler[CallbackT]) -> CallbackHandler[CallbackT]:
+            _, handlers = self._routes.setdefault(factory.__prefix__, (factory, {}))
+            for action in actions:
+                if action in handlers:
+                    msg = f"Действие {factory.__prefix__}:{action} уже зарегистрировано."
+                    raise ValueError(msg)
+                handlers[action] = handler
+            return handler
+
+        return decorator
+
+    async def dispatch(self, callback: types.CallbackQuery) -> bool:
+        """Вызывает обработчик колбэка. Возвращает False, если колбэк не распознан."""
+        data = callback.data or ""
+        if ":" not in data:
+            data = _from_legacy(data)
+        route = self._routes.get(data.partition(":")[0])
+        if route is None:
+            return False
+        factory, handlers = route
+        try:
+            callback_data = factory.unpack(data)
+        except (TypeError, ValueError):
+            return False
+        if (handler := handlers.get(callback_data.action)) is None:
+            return False
+        await handler(callback, callback_data)
+        return True
+
+
+KeyboardType = Literal["accept", "complete", "reject", "unlock", "duplicate", "queue"]
+
+_ACCEPT_ROW = [("Принять заявку", TicketCallback, "accept"), ("Отменить заявку", TicketCallback, "canceled")]
+_LAYOUTS: dict[KeyboardType, list[list[tuple[str, type[CallbackData], str]]]] = {
+    "accept": [_ACCEPT_ROW],
+    "complete": [[("Отменить заявку", TicketCallback, "canceled"), ("Закрыть заявку", TicketCallback, "completed")]],
+    "reject": [[("Отменить заявку", TicketCallback, "usercancel")]],
+    "unlock": [[("Разблокировать пользователя.", UserCallback, "unlock")]],
+    "duplicate": [
+        _ACCEPT_ROW,
+        [("Связать дубликаты", DuplicateCallback, "link"), ("Закрыть группу", DuplicateCallback, "close")],
+    ],
+    "queue": [[("Взять следующую заявку", QueueCallback, "take")]],
+}
+# Кнопки собираются один раз при импорте, на каждый вызов подставляется только id в callback_data.
+_TEMPLATES = {
+    keyboard_type: [
+        [
+            (
+                types.InlineKeyboardButton(text=text, callback_data=factory(action=action, id=0).pack()),
+                f"{factory.__prefix__}{factory.__separator__}{action}{factory.__separator__}",
+            )
+            for text, factory, action in row
+        ]
+        for row in rows
+    ]
+    for keyboard_type, rows in _LAYOUTS.items()
+}
+
+
+def buttons_keyboard(unique_id: int, keyboard_type: KeyboardType = "accept") -> types.InlineKeyboardMarkup:
+    """
+    Формирует клавиатуру в зависимости от нужного варианта.
+    'accept' - по умолчанию, кнопки Принять / Отменить.
+    'complete' - кнопки Отменить / Закрыть.
+    'reject' - кнопка Отменить для пользователя.
+    'unlock' - кнопка Разблокировать пользователя.
+    'duplicate' - кнопки Принять / Отменить и Связать / Закрыть группу дубликатов.
+    'queue' - кнопка Взять следующую заявку из очереди.
+    """
+    return types.InlineKeyboardMarkup.model_construct(
+        inline_keyboard=[
+            [button.model_copy(update={"callback_data": f"{prefix}{unique_id}"}) for button, prefix in row]
+            for row in _TEMPLATES[keyboard_type]
+        ]
+    )
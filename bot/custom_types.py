@@ -1,4 +1,5 @@
 from typing import Literal, TypeAlias
+from datetime import datetime
 from enum import Enum
 
 from pydantic import BaseModel
@@ -6,6 +7,7 @@ from pydantic import BaseModel
 from aiogram.fsm.state import StatesGroup, State
 
 status_type: TypeAlias = Literal["new", "in_work", "completed", "rejected"]
+delivery_status_type: TypeAlias = Literal["sent", "failed", "blocked"]
 
 
 class StatusEnum(Enum):
@@ -34,6 +36,37 @@ class TicketDictID(TicketDict):
     id: int
 
 
+class TicketStateDTO(BaseModel):
+    """Срез тикета, который получают подписчики на изменения тикетов (SLA и т.п.)."""
+
+    id: int
+    user_uid: int
+    status: status_type
+    is_priority: int = 0
+    dates_created: datetime
+    last_updated: datetime
+
+
+class CommentDTO(BaseModel):
+    id: int
+    ticket_id: int
+    author_uid: int
+    text: str
+    dates_created: datetime
+
+
+class BroadcastDTO(BaseModel):
+    id: int
+    text: str
+    status: Literal["running", "done"]
+    last_user_id: int
+    sent: int
+    failed: int
+    pruned: int
+    chat_id: int
+    progress_message_id: int
+
+
 class TicketStates(StatesGroup):
     title = State()
     description = State()
@@ -1,9 +1,42 @@
-from collections.abc import Sequence
+from collections.abc import Callable, Sequence
 from datetime import datetime, timezone
 
-from custom_types import TicketDict, TicketDictID, UserDTO, status_type
-from sqlalchemy import DateTime, ForeignKey, Integer, String, Text, create_engine, select
-from sqlalchemy.orm import DeclarativeBase, Mapped, MappedAsDataclass, mapped_column, relationship, sessionmaker
+from custom_types import (
+    BroadcastDTO,
+    CommentDTO,
+    TicketDict,
+    TicketDictID,
+    TicketStateDTO,
+    UserDTO,
+    delivery_status_type,
+    status_type,
+)
+from dedup import duplicate_index, minhash_signature
+from sqlalchemy import (
+    DateTime,
+    Engine,
+    ForeignKey,
+    Integer,
+    LargeBinary,
+    String,
+    Text,
+    UniqueConstraint,
+    create_engine,
+    delete,
+    func,
+    select,
+    update,
+)
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import (
+    DeclarativeBase,
+    Mapped,
+    MappedAsDataclass,
+    Session as OrmSession,
+    mapped_column,
+    relationship,
+    sessionmaker,
+)
 
 
 class Base(MappedAsDataclass, DeclarativeBase, repr=False, unsafe_hash=True, kw_only=True):
@@ -52,6 +85,25 @@ def add_user(user_dict: UserDTO) -> User:
         return new_user
 
 
+def delete_user(user_uid: int) -> None:
+    """Удаляет пользователя из списка зарегистрированных (например, если он заблокировал бота)."""
+    with Session() as session:
+        session.execute(delete(User).where(User.user_uid == user_uid))
+        session.commit()
+
+
+def count_users() -> int:
+    with Session() as session:
+        return session.scalar(select(func.count(User.id))) or 0
+
+
+def next_recipients(after_id: int, limit: int) -> list[tuple[int, int]]:
+    """Следующая страница пользователей (id, user_uid) после after_id, постранично по первичному ключу."""
+    with Session() as session:
+        rows = session.execute(select(User.id, User.user_uid).where(User.id > after_id).order_by(User.id).limit(limit))
+        return [(user_id, user_uid) for user_id, user_uid in rows]
+
+
 class BlockedUser(Base, sessionmaker):
     __tablename__ = "blocked_users"
     user_uid: Mapped[int] = mapped_column(Integer)
@@ -103,8 +155,39 @@ class Ticket(Base, sessionmaker):
     def as_ticket_dict(self) -> TicketDict:
         return TicketDict(user_uid=self.user_uid, title=self.title, description=self.description, status=self.status)
 
+    def as_ticket_state(self) -> TicketStateDTO:
+        return TicketStateDTO(
+            id=self.id,
+            user_uid=self.user_uid,
+            status=self.status,
+            is_priority=self.user.is_priority if self.user else 0,
+            dates_created=self.dates_created,
+            last_updated=self.last_updated,
+        )
+
+
+class TicketFingerprint(Base, sessionmaker):
+    """MinHash подпись тикета для поиска дубликатов и ссылка на основной тикет группы."""
 
-def list_tickets(uid=0, status: str | None = None) -> Sequence[TicketDict]:
+    __tablename__ = "ticket_fingerprints"
+    ticket_id: Mapped[int] = mapped_column(Integer, ForeignKey("tickets.id"), unique=True)
+    signature: Mapped[bytes] = mapped_column(LargeBinary)
+    duplicate_of: Mapped[int | None] = mapped_column(Integer, nullable=True, default=None)
+
+
+# Подписчики на создание тикетов и смену их статуса. Вызываются после коммита.
+ticket_hooks: list[Callable[[TicketStateDTO], None]] = []
+
+
+def _notify_ticket_hooks(ticket: Ticket) -> None:
+    if not ticket_hooks:
+        return
+    state = ticket.as_ticket_state()
+    for hook in ticket_hooks:
+        hook(state)
+
+
+def list_tickets(uid=0, status: str | None = None) -> Sequence[TicketDictID]:
     """Возвращает список словарей тикетов"""
     with Session() as session:
         if uid != 0:
@@ -115,7 +198,7 @@ def list_tickets(uid=0, status: str | None = None) -> Sequence[TicketDict]:
             select_tickets = select(Ticket).where(Ticket.status.__eq__(status))
 
         return [
-            TicketDict.model_validate(ticket, from_attributes=True)
+            TicketDictID.model_validate(ticket, from_attributes=True)
             for ticket in session.query(select_tickets.subquery()).all()
         ]
 
@@ -154,6 +237,7 @@ def edit_ticket_status(
             ticket.status = new_status
             ticket.last_updated = datetime.now(tz=timezone.utc)
             session.commit()
+            _notify_ticket_hooks(ticket)
 
 
 def add_ticket(ticket_dict: TicketDict) -> int:
@@ -169,10 +253,239 @@ def add_ticket(ticket_dict: TicketDict) -> int:
         )
         print(new_ticket)
         session.add(new_ticket)
+        session.flush()
+        signature = minhash_signature(f"{ticket_dict.title or ''} {ticket_dict.description or ''}")
+        session.add(TicketFingerprint(ticket_id=new_ticket.id, signature=signature))
         session.commit()
+        duplicate_index.add(new_ticket.id, signature)
+        _notify_ticket_hooks(new_ticket)
         return new_ticket.id
 
 
-engine = create_engine("sqlite:///bot.db", echo=True)
-Base.metadata.create_all(engine)
-Session = sessionmaker(autoflush=False, bind=engine)
+def list_open_ticket_states() -> list[TicketStateDTO]:
+    """Возвращает срезы всех незакрытых тикетов одним запросом вместе с приоритетом пользователя."""
+    with Session() as session:
+        rows = session.execute(
+            select(Ticket, User.is_priority)
+            .join(User, User.user_uid == Ticket.user_uid, isouter=True)
+            .where(Ticket.status.in_(("new", "in_work")))
+        ).all()
+        return [
+            TicketStateDTO(
+                id=ticket.id,
+                user_uid=ticket.user_uid,
+                status=ticket.status,
+                is_priority=is_priority or 0,
+                dates_created=ticket.dates_created,
+                last_updated=ticket.last_updated,
+            )
+            for ticket, is_priority in rows
+        ]
+
+
+def list_open_ticket_signatures() -> list[tuple[int, bytes]]:
+    """
+    Возвращает пары (id тикета, MinHash подпись) для всех незакрытых тикетов.
+    Незакрытым тикетам без подписи (созданным до появления поиска дубликатов) подпись вычисляется и сохраняется.
+    """
+    with Session() as session:
+        rows = session.execute(
+            select(Ticket.id, Ticket.title, Ticket.description, TicketFingerprint.signature)
+            .join(TicketFingerprint, TicketFingerprint.ticket_id == Ticket.id, isouter=True)
+            .where(Ticket.status.in_(("new", "in_work")))
+        ).all()
+        signatures = []
+        for ticket_id, title, description, stored in rows:
+            signature = stored
+            if signature is None:
+                signature = minhash_signature(f"{title or ''} {description or ''}")
+                session.add(TicketFingerprint(ticket_id=ticket_id, signature=signature))
+            signatures.append((ticket_id, signature))
+        session.commit()
+        return signatures
+
+
+def link_duplicates(root_id: int, ticket_ids: Sequence[int]) -> None:
+    """Помечает тикеты как дубликаты основного тикета root_id."""
+    with Session() as session:
+        session.execute(
+            update(TicketFingerprint)
+            .where(TicketFingerprint.ticket_id.in_([ticket_id for ticket_id in ticket_ids if ticket_id != root_id]))
+            .values(duplicate_of=root_id)
+        )
+        session.commit()
+
+
+def list_linked_ticket_ids(root_id: int) -> list[int]:
+    """Возвращает id незакрытых тикетов, связанных с основным тикетом root_id."""
+    with Session() as session:
+        return list(
+            session.scalars(
+                select(TicketFingerprint.ticket_id)
+                .join(Ticket, Ticket.id == TicketFingerprint.ticket_id)
+                .where(TicketFingerprint.duplicate_of == root_id, Ticket.status.in_(("new", "in_work")))
+            )
+        )
+
+
+class Broadcast(Base, sessionmaker):
+    """Рассылка администратора. last_user_id - курсор по users.id, до которого рассылка пройдена."""
+
+    __tablename__ = "broadcasts"
+    text: Mapped[str] = mapped_column(Text)
+    status: Mapped[str] = mapped_column(String, default="running")
+    last_user_id: Mapped[int] = mapped_column(Integer, default=0)
+    sent: Mapped[int] = mapped_column(Integer, default=0)
+    failed: Mapped[int] = mapped_column(Integer, default=0)
+    pruned: Mapped[int] = mapped_column(Integer, default=0)
+    chat_id: Mapped[int] = mapped_column(Integer)
+    progress_message_id: Mapped[int] = mapped_column(Integer)
+
+
+class BroadcastDelivery(Base, sessionmaker):
+    __tablename__ = "broadcast_deliveries"
+    __table_args__ = (UniqueConstraint("broadcast_id", "user_uid"),)
+    broadcast_id: Mapped[int] = mapped_column(Integer, ForeignKey("broadcasts.id"))
+    user_uid: Mapped[int] = mapped_column(Integer)
+    status: Mapped[delivery_status_type] = mapped_column(String)
+
+
+def create_broadcast(text: str, chat_id: int, progress_message_id: int) -> int:
+    with Session() as session:
+        broadcast = Broadcast(text=text, chat_id=chat_id, progress_message_id=progress_message_id)
+        session.add(broadcast)
+        session.commit()
+        return broadcast.id
+
+
+def get_broadcast(broadcast_id: int) -> BroadcastDTO | None:
+    with Session() as session:
+        broadcast = session.get(Broadcast, broadcast_id)
+        return BroadcastDTO.model_validate(broadcast, from_attributes=True) if broadcast else None
+
+
+def list_running_broadcast_ids() -> list[int]:
+    """Незавершённые рассылки, которые нужно продолжить после перезапуска."""
+    with Session() as session:
+        return list(session.scalars(select(Broadcast.id).where(Broadcast.status == "running")))
+
+
+def delivered_uids(broadcast_id: int, user_uids: Sequence[int]) -> set[int]:
+    """Из переданных получателей возвращает тех, по кому рассылка уже отработала."""
+    with Session() as session:
+        return set(
+            session.scalars(
+                select(BroadcastDelivery.user_uid).where(
+                    BroadcastDelivery.broadcast_id == broadcast_id, BroadcastDelivery.user_uid.in_(user_uids)
+                )
+            )
+        )
+
+
+def record_delivery(broadcast_id: int, user_uid: int, status: delivery_status_type) -> None:
+    """Сохраняет результат отправки одному получателю и обновляет счётчики рассылки."""
+    counter = {"sent": Broadcast.sent, "failed": Broadcast.failed, "blocked": Broadcast.pruned}[status]
+    with Session() as session:
+        inserted = session.execute(
+            sqlite_insert(BroadcastDelivery)
+            .values(broadcast_id=broadcast_id, user_uid=user_uid, status=status)
+            .on_conflict_do_nothing()
+        )
+        if inserted.rowcount:
+            session.execute(update(Broadcast).where(Broadcast.id == broadcast_id).values({counter: counter + 1}))
+        session.commit()
+
+
+def advance_broadcast(broadcast_id: int, last_user_id: int, *, done: bool = False) -> None:
+    with Session() as session:
+        values = {"last_user_id": last_user_id}
+        if done:
+            values["status"] = "done"
+        session.execute(update(Broadcast).where(Broadcast.id == broadcast_id).values(**values))
+        session.commit()
+
+
+class TicketComment(Base, sessionmaker):
+    __tablename__ = "ticket_comments"
+    ticket_id: Mapped[int] = mapped_column(Integer, ForeignKey("tickets.id"), index=True)
+    author_uid: Mapped[int] = mapped_column(Integer)
+    text: Mapped[str] = mapped_column(Text)
+    dates_created: Mapped[datetime] = mapped_column(DateTime)
+
+
+class TicketMessage(Base, sessionmaker):
+    """Сообщение бота по тикету: ответ на него пересылается второй стороне переписки."""
+
+    __tablename__ = "ticket_messages"
+    __table_args__ = (UniqueConstraint("chat_id", "message_id"),)
+    chat_id: Mapped[int] = mapped_column(Integer)
+    message_id: Mapped[int] = mapped_column(Integer)
+    ticket_id: Mapped[int] = mapped_column(Integer, ForeignKey("tickets.id"))
+    ticket_user_uid: Mapped[int] = mapped_column(Integer)
+
+
+def add_comment(ticket_id: int, author_uid: int, text: str) -> int:
+    with Session() as session:
+        comment = TicketComment(
+            ticket_id=ticket_id, author_uid=author_uid, text=text, dates_created=datetime.now(tz=timezone.utc)
+        )
+        session.add(comment)
+        session.commit()
+        return comment.id
+
+
+def list_comments(ticket_id: int, after_id: int = 0, limit: int = 10) -> list[CommentDTO]:
+    """Страница комментариев тикета после комментария after_id, по порядку добавления."""
+    with Session() as session:
+        return [
+            CommentDTO.model_validate(comment, from_attributes=True)
+            for comment in session.scalars(
+                select(TicketComment)
+                .where(TicketComment.ticket_id == ticket_id, TicketComment.id > after_id)
+                .order_by(TicketComment.id)
+                .limit(limit)
+            )
+        ]
+
+
+def add_ticket_message(chat_id: int, message_id: int, ticket_id: int, ticket_user_uid: int) -> None:
+    with Session() as session:
+        session.execute(
+            sqlite_insert(TicketMessage)
+            .values(chat_id=chat_id, message_id=message_id, ticket_id=ticket_id, ticket_user_uid=ticket_user_uid)
+            .on_conflict_do_nothing()
+        )
+        session.commit()
+
+
+def get_message_ticket(chat_id: int, message_id: int) -> tuple[int, int] | None:
+    """Возвращает (id тикета, uid автора тикета) для сообщения бота или None."""
+    with Session() as session:
+        row = session.execute(
+            select(TicketMessage.ticket_id, TicketMessage.ticket_user_uid).where(
+                TicketMessage.chat_id == chat_id, TicketMessage.message_id == message_id
+            )
+        ).one_or_none()
+        return (row.ticket_id, row.ticket_user_uid) if row else None
+
+
+DATABASE_URL = "sqlite:///bot.db"
+_engine: Engine | None = None
+_session_factory = sessionmaker(autoflush=False)
+
+
+def get_engine() -> Engine:
+    """Движок создаётся при первом обращении к БД, а не при импорте модуля."""
+    global _engine
+    if _engine is None:
+        _engine = create_engine(DATABASE_URL, echo=True)
+    return _engine
+
+
+def Session() -> OrmSession:
+    return _session_factory(bind=get_engine())
+
+
+def init_schema() -> None:
+    """Создаёт недостающие таблицы. Вызывается при старте бота."""
+    Base.metadata.create_all(get_engine())
@@ -0,0 +1,112 @@
+from collections import defaultdict
+from collections.abc import Iterable
+from array import array
+import hashlib
+import random
+import re
+
+from custom_types import TicketStateDTO
+
+NUM_PERM = 64
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+# Порог оценки сходства Жаккара: от этого значения тикет считается вероятным дубликатом.
+DUPLICATE_THRESHOLD = 0.5
+SHINGLE_SIZE = 3
+
+_PRIME = 4294967291  # Наибольшее простое меньше 2**32, значения подписи помещаются в uint32.
+_MAX_HASH = 2**32 - 1
+# Коэффициенты фиксированы: подписи хранятся в БД и должны совпадать между перезапусками.
+# ГПСЧ детерминирован намеренно, криптостойкость здесь не нужна.
+_rng = random.Random(0x7E1E)  # noqa: S311
+_PERMUTATIONS = [(_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME)) for _ in range(NUM_PERM)]
+_WORDS = re.compile(r"\w+")
+
+
+def _shingles(text: str) -> set[int]:
+    normalized = " ".join(_WORDS.findall(text.lower()))
+    if len(normalized) <= SHINGLE_SIZE:
+        grams = {normalized}
+    else:
+        grams = {normalized[i : i + SHINGLE_SIZE] for i in range(len(normalized) - SHINGLE_SIZE + 1)}
+    return {int.from_bytes(hashlib.blake2b(gram.encode(), digest_size=4).digest(), "little") for gram in grams}
+
+
+def minhash_signature(text: str) -> bytes:
+    """MinHash подпись текста: NUM_PERM значений uint32, 256 байт для хранения в БД."""
+    shingles = _shingles(text)
+    signature = array(
+        "I",
+        (min(((a * x + b) % _PRIME for x in shingles), default=_MAX_HASH) for a, b in _PERMUTATIONS),
+    )
+    return signature.tobytes()
+
+
+def similarity(first: bytes, second: bytes) -> float:
+    """Оценка сходства Жаккара по доле совпавших значений подписи."""
+    left, right = array("I", first), array("I", second)
+    return sum(x == y for x, y in zip(left, right)) / NUM_PERM
+
+
+def _band_keys(signature: bytes) -> list[bytes]:
+    step = ROWS * 4
+    return [bytes([band]) + signature[band * step : (band + 1) * step] for band in range(BANDS)]
+
+
+class DuplicateIndex:
+    """
+    LSH индекс MinHash подписей открытых тикетов.
+    Подпись режется на BANDS полос, кандидаты - тикеты, совпавшие хотя бы в одной полосе,
+    поэтому поиск не зависит от общего числа тикетов.
+    """
+
+    def __init__(self) -> None:
+        self._buckets: defaultdict[bytes, set[int]] = defaultdict(set)
+        self._signatures: dict[int, bytes] = {}
+
+    def __len__(self) -> int:
+        return len(self._signatures)
+
+    def rebuild(self, signatures: Iterable[tuple[int, bytes]]) -> None:
+        self._buckets.clear()
+        self._signatures.clear()
+        for ticket_id, signature in signatures:
+            self.add(ticket_id, signature)
+
+    def add(self, ticket_id: int, signature: bytes) -> None:
+        if ticket_id in self._signatures:
+            return
+        self._signatures[ticket_id] = signature
+        for key in _band_keys(signature):
+            self._buckets[key].add(ticket_id)
+
+    def remove(self, ticket_id: int) -> None:
+        if (signature := self._signatures.pop(ticket_id, None)) is None:
+            return
+        for key in _band_keys(signature):
+            bucket = self._buckets[key]
+            bucket.discard(ticket_id)
+            if not bucket:
+                del self._buckets[key]
+
+    def on_ticket_change(self, state: TicketStateDTO) -> None:
+        """Подписчик db.ticket_hooks: убирает закрытые тикеты. Новые тикеты добавляет db.add_ticket."""
+        if state.status in ("completed", "rejected"):
+            self.remove(state.id)
+
+    def similar(self, ticket_id: int, threshold: float = DUPLICATE_THRESHOLD) -> list[int]:
+        """Открытые тикеты, похожие на данный, по возрастанию id."""
+        if (signature := self._signatures.get(ticket_id)) is None:
+            return []
+        candidates = set()
+        for key in _band_keys(signature):
+            candidates |= self._buckets.get(key, set())
+        candidates.discard(ticket_id)
+        return sorted(
+            candidate
+            for candidate in candidates
+            if similarity(signature, self._signatures[candidate]) >= threshold
+        )
+
+
+duplicate_index = DuplicateIndex()
@@ -0,0 +1,42 @@
+from collections import OrderedDict
+
+from db import add_ticket_message, get_message_ticket
+
+MessageKey = tuple[int, int]
+TicketRef = tuple[int, int]
+
+
+class MessageTicketIndex:
+    """
+    Индекс (chat_id, message_id) -> (id тикета, uid автора тикета) для сообщений бота.
+    Постоянная копия хранится в таблице ticket_messages, перед ней LRU кэш на maxsize записей.
+    """
+
+    def __init__(self, maxsize: int = 4096) -> None:
+        self.maxsize = maxsize
+        self._cache: OrderedDict[MessageKey, TicketRef] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._cache)
+
+    def _put(self, key: MessageKey, value: TicketRef) -> None:
+        self._cache[key] = value
+        self._cache.move_to_end(key)
+        if len(self._cache) > self.maxsize:
+            self._cache.popitem(last=False)
+
+    def get(self, chat_id: int, message_id: int) -> TicketRef | None:
+        key = (chat_id, message_id)
+        if (value := self._cache.get(key)) is not None:
+            self._cache.move_to_end(key)
+            return value
+        if (value := get_message_ticket(chat_id, message_id)) is not None:
+            self._put(key, value)
+        return value
+
+    def remember(self, chat_id: int, message_id: int, ticket_id: int, ticket_user_uid: int) -> None:
+        add_ticket_message(chat_id, message_id, ticket_id, ticket_user_uid)
+        self._put((chat_id, message_id), (ticket_id, ticket_user_uid))
+
+
+message_index = MessageTicketIndex()
@@ -0,0 +1,144 @@
+import logging
+from collections.abc import Awaitable, Callable, Iterable
+from datetime import datetime, timedelta, timezone
+import asyncio
+import contextlib
+import heapq
+import time
+
+from custom_types import TicketStateDTO, status_type
+
+logger = logging.getLogger(__name__)
+
+# Сроки реакции: (обычный пользователь, приоритетный пользователь).
+SLA_LIMITS: dict[status_type, tuple[timedelta, timedelta]] = {
+    "new": (timedelta(hours=4), timedelta(hours=1)),
+    "in_work": (timedelta(hours=24), timedelta(hours=8)),
+}
+
+EscalationCallback = Callable[[TicketStateDTO, int], Awaitable[None]]
+
+
+def _timestamp(value: datetime) -> float:
+    # SQLite отдаёт даты без tzinfo, в базе они хранятся в UTC.
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+def sla_limit(state: TicketStateDTO) -> timedelta | None:
+    """Срок SLA для тикета в его текущем статусе, None для закрытых тикетов."""
+    limits = SLA_LIMITS.get(state.status)
+    if limits is None:
+        return None
+    return limits[1] if state.is_priority > 0 else limits[0]
+
+
+def sla_deadline(state: TicketStateDTO) -> float | None:
+    """
+    Дедлайн тикета в секундах epoch.
+    'new' отсчитывается от dates_created, 'in_work' - от last_updated (момента принятия в работу).
+    """
+    limit = sla_limit(state)
+    if limit is None:
+        return None
+    started = state.dates_created if state.status == "new" else state.last_updated
+    return _timestamp(started) + limit.total_seconds()
+
+
+class SLAScheduler:
+    """
+    Планировщик SLA на min-куче дедлайнов открытых тикетов.
+    Куча строится из БД один раз при старте (rebuild), дальше обновляется через on_ticket_change.
+    Устаревшие записи кучи не удаляются сразу, а отбрасываются при извлечении (по номеру поколения).
+    """
+
+    def __init__(self) -> None:
+        self._heap: list[tuple[float, int, int]] = []
+        self._entries: dict[int, tuple[int, TicketStateDTO, int]] = {}
+        self._generation = 0
+        self._wakeup = asyncio.Event()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def rebuild(self, states: Iterable[TicketStateDTO]) -> None:
+        """Полностью пересобирает кучу по списку открытых тикетов."""
+        self._heap.clear()
+        self._entries.clear()
+        for state in states:
+            if (deadline := sla_deadline(state)) is not None:
+                self._generation += 1
+                self._entries[state.id] = (self._generation, state, 0)
+                self._heap.append((deadline, state.id, self._generation))
+        heapq.heapify(self._heap)
+        self._wakeup.set()
+
+    def on_ticket_change(self, state: TicketStateDTO) -> None:
+        """Подписчик db.ticket_hooks: ставит новый дедлайн или снимает тикет с контроля."""
+        deadline = sla_deadline(state)
+        if deadline is None:
+            self._entries.pop(state.id, None)
+        else:
+            self._push(state, deadline, 0)
+        self._compact()
+        self._wakeup.set()
+
+    def next_deadline(self) -> float | None:
+        self._drop_stale()
+        return self._heap[0][0] if self._heap else None
+
+    def _push(self, state: TicketStateDTO, deadline: float, level: int) -> None:
+        self._generation += 1
+        self._entries[state.id] = (self._generation, state, level)
+        heapq.heappush(self._heap, (deadline, state.id, self._generation))
+
+    def _is_stale(self, ticket_id: int, generation: int) -> bool:
+        entry = self._entries.get(ticket_id)
+        return entry is None or entry[0] != generation
+
+    def _drop_stale(self) -> None:
+        while self._heap and self._is_stale(self._heap[0][1], self._heap[0][2]):
+            heapq.heappop(self._heap)
+
+    def _compact(self) -> None:
+        # Куча не должна разрастаться из-за устаревших записей.
+        if len(self._heap) > 2 * len(self._entries) + 64:
+            self._heap = [item for item in self._heap if not self._is_stale(item[1], item[2])]
+            heapq.heapify(self._heap)
+
+    def pop_expired(self, now: float) -> list[tuple[TicketStateDTO, int]]:
+        """
+        Извлекает тикеты с истекшим дедлайном.
+        Каждый из них перепланируется на следующий интервал SLA с увеличенным уровнем эскалации.
+        """
+        expired = []
+        while (deadline := self.next_deadline()) is not None and deadline <= now:
+            _, ticket_id, _ = heapq.heappop(self._heap)
+            _, state, level = self._entries[ticket_id]
+            expired.append((state, level + 1))
+            self._push(state, max(deadline, now) + sla_limit(state).total_seconds(), level + 1)
+        return expired
+
+    @staticmethod
+    async def _escalate(escalate: EscalationCallback, state: TicketStateDTO, level: int) -> None:
+        # Ошибка отправки одного напоминания не должна останавливать планировщик.
+        try:
+            await escalate(state, level)
+        except Exception:
+            logger.exception("Не удалось отправить напоминание SLA по тикету %s", state.id)
+
+    async def run(self, escalate: EscalationCallback) -> None:
+        """Единственная фоновая задача: спит до ближайшего дедлайна или до изменения кучи."""
+        while True:
+            self._wakeup.clear()
+            for state, level in self.pop_expired(time.time()):
+                await self._escalate(escalate, state, level)
+
+            deadline = self.next_deadline()
+            timeout = None if deadline is None else max(deadline - time.time(), 0)
+            with contextlib.suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+
+
+sla_scheduler = SLAScheduler()
@@ -0,0 +1,83 @@
+import logging
+from collections.abc import Callable, Iterator
+from typing import TypeVar
+import asyncio
+import contextlib
+import time
+
+from aiogram import Bot
+from db import init_schema, list_open_ticket_signatures, list_open_ticket_states, list_running_broadcast_ids, ticket_hooks
+from dedup import duplicate_index
+from sla import sla_scheduler
+from ticket_queue import ticket_queue
+
+logger = logging.getLogger(__name__)
+
+# Бюджет времени от вызова create_app до начала polling, секунды.
+STARTUP_BUDGET = 3.0
+
+T = TypeVar("T")
+
+
+class StartupTimer:
+    """Замеряет этапы запуска бота и формирует отчёт."""
+
+    def __init__(self) -> None:
+        self.started = time.perf_counter()
+        self.phases: dict[str, float] = {}
+
+    @contextlib.contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = time.perf_counter() - started
+
+    async def in_thread(self, name: str, func: Callable[[], T]) -> T:
+        """Выполняет блокирующую работу (запросы к БД) в отдельном потоке, не задерживая остальной прогрев."""
+        with self.phase(name):
+            return await asyncio.to_thread(func)
+
+    @property
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def report(self) -> str:
+        phases = ", ".join(f"{name}: {seconds * 1000:.0f} мс" for name, seconds in self.phases.items())
+        status = "в пределах бюджета" if self.elapsed <= STARTUP_BUDGET else "бюджет превышен"
+        return f"Готов за {self.elapsed * 1000:.0f} мс ({status} {STARTUP_BUDGET * 1000:.0f} мс). {phases}"
+
+
+async def _warm_up_db(timer: StartupTimer) -> list[int]:
+    await timer.in_thread("schema", init_schema)
+    open_tickets, signatures, broadcast_ids = await asyncio.gather(
+        timer.in_thread("open_tickets", list_open_ticket_states),
+        timer.in_thread("signatures", list_open_ticket_signatures),
+        timer.in_thread("broadcasts", list_running_broadcast_ids),
+    )
+    with timer.phase("indexes"):
+        sla_scheduler.rebuild(open_tickets)
+        ticket_queue.rebuild(open_tickets)
+        duplicate_index.rebuild(signatures)
+        ticket_hooks.extend(
+            (sla_scheduler.on_ticket_change, ticket_queue.on_ticket_change, duplicate_index.on_ticket_change)
+        )
+    return broadcast_ids
+
+
+async def _warm_up_bot(timer: StartupTimer, bot: Bot) -> None:
+    # bot.me() кэшируется, start_polling и create_start_link повторно в сеть не пойдут.
+    with timer.phase("get_me"):
+        await bot.me()
+
+
+async def warm_up(timer: StartupTimer, bot: Bot) -> list[int]:
+    """
+    Параллельно проверяет схему БД с прогревом кэшей и запрашивает данные бота в Telegram.
+    Возвращает id незавершённых рассылок.
+    """
+    with timer.phase("warm_up"):
+        broadcast_ids, _ = await asyncio.gather(_warm_up_db(timer), _warm_up_bot(timer, bot))
+    logger.info(timer.report())
+    return broadcast_ids
@@ -0,0 +1,75 @@
+from collections.abc import Iterable
+from datetime import timezone
+import heapq
+
+from custom_types import TicketStateDTO
+
+QueueKey = tuple[int, float, int]
+
+
+def queue_key(state: TicketStateDTO) -> QueueKey:
+    """Сначала приоритетные пользователи (больший is_priority), затем более старые заявки."""
+    created = state.dates_created
+    if created.tzinfo is None:
+        created = created.replace(tzinfo=timezone.utc)
+    return -state.is_priority, created.timestamp(), state.id
+
+
+class TicketQueue:
+    """
+    Очередь новых заявок для администратора на min-куче по queue_key.
+    Строится из БД при старте, дальше обновляется через db.ticket_hooks.
+    Заявки, которые ушли из статуса 'new', удаляются лениво - при выходе на вершину кучи.
+    """
+
+    def __init__(self) -> None:
+        self._heap: list[QueueKey] = []
+        self._queued: set[int] = set()
+
+    def __len__(self) -> int:
+        return len(self._queued)
+
+    def rebuild(self, states: Iterable[TicketStateDTO]) -> None:
+        self._heap = [queue_key(state) for state in states if state.status == "new"]
+        self._queued = {key[2] for key in self._heap}
+        heapq.heapify(self._heap)
+
+    def on_ticket_change(self, state: TicketStateDTO) -> None:
+        """Подписчик db.ticket_hooks."""
+        if state.status == "new":
+            if state.id not in self._queued:
+                self._queued.add(state.id)
+                heapq.heappush(self._heap, queue_key(state))
+        else:
+            self._queued.discard(state.id)
+            if len(self._heap) > 2 * len(self._queued) + 64:
+                self._heap = [key for key in self._heap if key[2] in self._queued]
+                heapq.heapify(self._heap)
+
+    def _drop_stale(self) -> None:
+        while self._heap and self._heap[0][2] not in self._queued:
+            heapq.heappop(self._heap)
+
+    def pop(self) -> int | None:
+        """Забирает id следующей заявки, O(log n)."""
+        self._drop_stale()
+        if not self._heap:
+            return None
+        ticket_id = heapq.heappop(self._heap)[2]
+        self._queued.discard(ticket_id)
+        return ticket_id
+
+    def peek(self, count: int) -> list[int]:
+        """id первых count заявок без изъятия из очереди, O(count * log n)."""
+        taken: list[QueueKey] = []
+        while len(taken) < count:
+            self._drop_stale()
+            if not self._heap:
+                break
+            taken.append(heapq.heappop(self._heap))
+        for key in taken:
+            heapq.heappush(self._heap, key)
+        return [key[2] for key in taken]
+
+
+ticket_queue = TicketQueue()
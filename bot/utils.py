@@ -1,7 +1,8 @@
 from aiogram.types import Message
 from aiogram.utils.formatting import Text, as_list
 from custom_types import TicketDict, UserDTO
-from db import User, add_user, get_user_by_uid, list_ticket_ids
+from db import User, add_user, get_user_by_uid, list_linked_ticket_ids, list_ticket_ids
+from dedup import duplicate_index
 
 
 async def answer_register(
@@ -36,10 +37,17 @@ def new_user(user_uid: int, first_name: str, last_name: str, department: str) ->
 
 def raw_reply(item: TicketDict) -> Text:
     user = get_user_by_uid(item.user_uid)
+    if user is None:
+        # Пользователь мог быть удалён при рассылке, если заблокировал бота.
+        user_lines = (f"От пользователя: {item.user_uid} (не зарегистрирован)",)
+    else:
+        user_lines = (
+            f"От пользователя: {user.first_name} {user.last_name}",
+            f"Отдел: {user.department}",
+            f"Приоритет: {user.is_priority}",
+        )
     return as_list(
-        f"От пользователя: {user.first_name} {user.last_name}",
-        f"Отдел: {user.department}",
-        f"Приоритет: {user.is_priority}",
+        *user_lines,
         f"Заголовок: {item.title}",
         f"Описание: {item.description}",
         f"Статус: {item.status}",
@@ -51,6 +59,13 @@ def reply_list(item: TicketDict) -> dict:
     return raw_reply(item).as_kwargs()
 
 
+def duplicate_cluster(ticket_id: int) -> list[int]:
+    """Группа открытых дубликатов тикета: похожие по LSH индексу и уже связанные вручную. Первый id - основной."""
+    cluster = {ticket_id, *duplicate_index.similar(ticket_id)}
+    cluster.update(list_linked_ticket_ids(min(cluster)))
+    return sorted(cluster)
+
+
 def active_tickets(chat_id: int) -> str:
     tickets = list_ticket_ids(chat_id)
     string_ticket = "Список ваших активных тикетов:"